@@ -8,35 +8,159 @@
 from __future__ import annotations
 
 import argparse
+from array import array
 import csv
-from dataclasses import dataclass
+import functools
+import gzip
+import hashlib
+import itertools
+import json
+import math
+import operator
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator
 
-from flask import Flask, Response, jsonify, render_template, request
+from flask import Flask, Response, current_app, jsonify, render_template, request, send_file
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib json decoder/encoder
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # optional: stream top-level market arrays instead of buffering
+    ijson = None
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # optional (Unix only): --serve falls back to Flask's dev server
+    BaseApplication = None
 
 API_URL = "https://api.reya.xyz/v2/marketDefinitions"
 OUTPUT_CSV = Path("reya_oi_caps.csv")
+# (connect, read) timeouts in seconds.
+API_TIMEOUT = (3.05, 30)
+STREAM_CHUNK_SIZE = 64 * 1024
+API_CACHE_CONTROL = "max-age=15, must-revalidate"
+API_COMPRESS_MIN_SIZE = 1024
+API_COMPRESS_LEVEL = 4
+
+CSV_FIELDS = ("market", "current_oi", "oiCap")
+CSV_METADATA_PREFIX = "# fetched_at_utc="
+CSV_BUFFER_SIZE = 1 << 20
+CSV_LINE_TERMINATOR = csv.excel.lineterminator
+# Characters that make the csv module quote a field.
+CSV_NEEDS_QUOTING = re.compile(r'[",\r\n]')
+# Numeric strings that format(Decimal(s), "f") would return unchanged.
+PLAIN_NUMBER = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?")
+# 19+ digit runs may be integers outside 64 bits, which orjson would turn into floats.
+LONG_DIGIT_RUN = re.compile(rb"[0-9]{19}")
+
+CURRENT_OI_FIELDS = (
+    "currentOi",
+    "current_oi",
+    "openInterest",
+    "open_interest",
+    "oi",
+    "currentOpenInterest",
+    "totalOpenInterest",
+)
+CURRENT_OI_NESTED_KEYS = ("stats", "metrics")
+
+SERVE_WORKERS = min(4, os.cpu_count() or 1)
+SERVE_THREADS = 8
+
+# Shared session so repeated refreshes reuse the keep-alive connection to the API.
+HTTP_SESSION = requests.Session()
+# One pooled connection per serving thread, so concurrent refreshes do not discard connections.
+HTTP_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=SERVE_THREADS))
+
+
+# (market, current_oi, oiCap) as formatted strings.
+ExportRow = tuple[str, str, str]
 
 
 @dataclass
 class ExportResult:
-    rows: list[dict[str, str]]
+    # One list per column, index-aligned.
+    markets: list[str]
+    current_oi: list[str]
+    oi_cap: list[str]
     fetched_at_utc: str
+    # Filter inputs derived once per export rather than once per row per request.
+    # Missing or unparsable numbers are NaN, which fails every bound comparison.
+    oi_cap_values: array[float] = field(init=False, repr=False)
+    current_oi_values: array[float] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.oi_cap_values = array("d", map(as_float, self.oi_cap))
+        self.current_oi_values = array("d", map(as_float, self.current_oi))
+
+    @classmethod
+    def from_rows(cls, rows: list[ExportRow], fetched_at_utc: str) -> ExportResult:
+        markets, current_oi, oi_cap = (list(column) for column in zip(*rows)) if rows else ([], [], [])
+        return cls(markets=markets, current_oi=current_oi, oi_cap=oi_cap, fetched_at_utc=fetched_at_utc)
+
+    def __len__(self) -> int:
+        return len(self.markets)
+
+    def row_tuples(self, indices: Iterable[int]) -> list[ExportRow]:
+        markets, current_oi, oi_cap = self.markets, self.current_oi, self.oi_cap
+        return [(markets[i], current_oi[i], oi_cap[i]) for i in indices]
+
+
+# Last parsed export as (path, file signature, result); re-read only when the file changes.
+CSV_CACHE: tuple[Path, tuple[int, int, int], ExportResult] | None = None
+CSV_CACHE_LOCK = threading.Lock()
+
+# Last formatted fetch timestamp as (unix second, ISO string).
+TIMESTAMP_CACHE: tuple[int, str] = (-1, "")
 
 
 def as_decimal(value: Any) -> Decimal | None:
     if value is None:
         return None
+    # Skip the str() round trip for exact numbers; floats (and bools) keep the old path.
+    value_type = type(value)
+    if value_type is Decimal:
+        return value
+    if value_type is int:
+        return Decimal(value)
     try:
         return Decimal(str(value))
     except (InvalidOperation, ValueError):
         return None
 
 
+def format_number(value: Any) -> str | None:
+    value_type = type(value)
+    if value_type is str and PLAIN_NUMBER.fullmatch(value):
+        return value
+    if value_type is int:
+        return str(value)
+    number = as_decimal(value)
+    return None if number is None else format(number, "f")
+
+
+def as_float(value: str) -> float:
+    if not value:
+        return math.nan
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
+
+
 def extract_markets(payload: Any) -> list[dict[str, Any]]:
     if isinstance(payload, list):
         return [item for item in payload if isinstance(item, dict)]
@@ -60,141 +184,244 @@ def market_name(market: dict[str, Any], idx: int) -> str:
     return f"market_{idx}"
 
 
-def extract_current_oi(market: dict[str, Any]) -> Decimal | None:
-    candidates = (
-        "currentOi",
-        "current_oi",
-        "openInterest",
-        "open_interest",
-        "oi",
-        "currentOpenInterest",
-        "totalOpenInterest",
-    )
-    for field in candidates:
-        oi = as_decimal(market.get(field))
+def extract_current_oi(market: dict[str, Any]) -> str | None:
+    get = market.get
+    for field_name in CURRENT_OI_FIELDS:
+        oi = format_number(get(field_name))
         if oi is not None:
             return oi
 
-    for nested_key in ("stats", "metrics"):
-        nested = market.get(nested_key)
+    for nested_key in CURRENT_OI_NESTED_KEYS:
+        nested = get(nested_key)
         if not isinstance(nested, dict):
             continue
-        for field in candidates:
-            oi = as_decimal(nested.get(field))
+        nested_get = nested.get
+        for field_name in CURRENT_OI_FIELDS:
+            oi = format_number(nested_get(field_name))
             if oi is not None:
                 return oi
 
-    long_oi = as_decimal(market.get("longOi")) or as_decimal(market.get("long_oi"))
-    short_oi = as_decimal(market.get("shortOi")) or as_decimal(market.get("short_oi"))
+    long_oi = as_decimal(get("longOi")) or as_decimal(get("long_oi"))
+    short_oi = as_decimal(get("shortOi")) or as_decimal(get("short_oi"))
     if long_oi is not None and short_oi is not None:
-        return long_oi + short_oi
+        return format(long_oi + short_oi, "f")
 
     return None
 
 
+def build_row(market: dict[str, Any], idx: int) -> ExportRow | None:
+    oi_cap = format_number(market.get("oiCap"))
+    if oi_cap is None:
+        return None
+
+    current_oi = extract_current_oi(market)
+    return (market_name(market, idx), "" if current_oi is None else current_oi, oi_cap)
+
+
+def build_rows(markets: Iterable[dict[str, Any]]) -> list[ExportRow]:
+    rows = map(build_row, markets, itertools.count(1))
+    return [row for row in rows if row is not None]
+
+
+def parse_rows(body: bytes) -> list[ExportRow]:
+    return build_rows(extract_markets(loads_json(body)))
+
+
+def loads_json(body: bytes) -> Any:
+    # Bodies orjson cannot represent exactly go through the stdlib parser instead.
+    if orjson is not None and not LONG_DIGIT_RUN.search(body):
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def decimals_to_floats(value: Any) -> Any:
+    # ijson returns reals as Decimal; float them so numbers match the json paths (1.50 -> "1.5").
+    value_type = type(value)
+    if value_type is Decimal:
+        return float(value)
+    if value_type is dict:
+        return {key: decimals_to_floats(item) for key, item in value.items()}
+    if value_type is list:
+        return [decimals_to_floats(item) for item in value]
+    return value
+
+
+def iter_streamed_markets(chunks: Iterable[bytes]) -> Iterator[Any]:
+    items = ijson.sendable_list()
+    # Not use_float: yajl2_c aborts the whole document on integers >= 2**63 with it.
+    coro = ijson.items_coro(items, "item")
+    for chunk in chunks:
+        coro.send(chunk)
+        yield from (decimals_to_floats(item) for item in items if isinstance(item, dict))
+        del items[:]
+    coro.close()
+    yield from (decimals_to_floats(item) for item in items if isinstance(item, dict))
+
+
+def stream_rows(response: requests.Response) -> list[ExportRow]:
+    chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if head.lstrip():
+            break
+    if not head.lstrip().startswith(b"["):
+        # Wrapped payloads need extract_markets' key priority, so buffer those.
+        return parse_rows(head + b"".join(chunks))
+    return build_rows(iter_streamed_markets(itertools.chain((head,), chunks)))
+
+
+def utc_timestamp() -> str:
+    global TIMESTAMP_CACHE
+    now = int(time.time())
+    cached = TIMESTAMP_CACHE
+    if cached[0] != now:
+        cached = (now, time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(now)))
+        TIMESTAMP_CACHE = cached
+    return cached[1]
+
+
 def fetch_rows() -> ExportResult:
-    response = requests.get(API_URL, timeout=30)
-    response.raise_for_status()
-    payload = response.json()
-    markets = extract_markets(payload)
-
-    rows: list[dict[str, str]] = []
-    for idx, market in enumerate(markets, start=1):
-        oi_cap = as_decimal(market.get("oiCap"))
-        if oi_cap is None:
-            continue
+    with HTTP_SESSION.get(API_URL, timeout=API_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        if ijson is not None:
+            rows = stream_rows(response)
+        else:
+            rows = parse_rows(response.content)
+
+    rows.sort(key=lambda row: row[0].lower())
+    return ExportResult.from_rows(rows, utc_timestamp())
+
+
+def write_csv(result: ExportResult, output_csv: Path = OUTPUT_CSV) -> os.stat_result:
+    columns = (result.markets, result.current_oi, result.oi_cap)
+    # Plain fields can be joined directly; anything needing quotes goes through csv.writer.
+    plain = not any(CSV_NEEDS_QUOTING.search("".join(column)) for column in columns)
+    # Write beside the target and rename over it, so readers in other server
+    # workers/threads never see a half-written export.
+    tmp_csv = output_csv.with_name(f".{output_csv.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp_csv.open("w", newline="", encoding="utf-8", buffering=CSV_BUFFER_SIZE) as csv_file:
+            csv_file.write(f"{CSV_METADATA_PREFIX}{result.fetched_at_utc}{CSV_LINE_TERMINATOR}")
+            csv_file.write(f"{','.join(CSV_FIELDS)}{CSV_LINE_TERMINATOR}")
+            if plain:
+                csv_file.write("".join(f"{m},{c},{o}{CSV_LINE_TERMINATOR}" for m, c, o in zip(*columns)))
+            else:
+                csv.writer(csv_file).writerows(zip(*columns))
+        # Stat the file we wrote, not the path: a concurrent writer may replace it next.
+        stat = tmp_csv.stat()
+        os.replace(tmp_csv, output_csv)
+    except BaseException:
+        tmp_csv.unlink(missing_ok=True)
+        raise
+    return stat
 
-        current_oi = extract_current_oi(market)
-        rows.append(
-            {
-                "market": market_name(market, idx),
-                "current_oi": "" if current_oi is None else format(current_oi, "f"),
-                "oiCap": format(oi_cap, "f"),
-            }
-        )
 
-    rows.sort(key=lambda row: row["market"].lower())
-    fetched_at_utc = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
-    return ExportResult(rows=rows, fetched_at_utc=fetched_at_utc)
+def csv_signature(stat: os.stat_result) -> tuple[int, int, int]:
+    # Size and inode catch rewrites that land within one coarse mtime tick.
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
 
 
-def write_csv(rows: list[dict[str, str]], fetched_at_utc: str, output_csv: Path = OUTPUT_CSV) -> None:
-    with output_csv.open("w", newline="", encoding="utf-8") as csv_file:
-        writer = csv.DictWriter(csv_file, fieldnames=["market", "current_oi", "oiCap", "fetched_at_utc"])
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(
-                {
-                    "market": row["market"],
-                    "current_oi": row["current_oi"],
-                    "oiCap": row["oiCap"],
-                    "fetched_at_utc": fetched_at_utc,
-                }
-            )
+def store_cached_export(output_csv: Path, result: ExportResult, signature: tuple[int, int, int]) -> None:
+    global CSV_CACHE
+    with CSV_CACHE_LOCK:
+        CSV_CACHE = (output_csv, signature, result)
 
 
 def read_csv_rows(output_csv: Path = OUTPUT_CSV) -> ExportResult:
+    signature = csv_signature(output_csv.stat())
+    with CSV_CACHE_LOCK:
+        cached = CSV_CACHE
+    if cached is not None and cached[0] == output_csv and cached[1] == signature:
+        return cached[2]
+
+    result = parse_csv_rows(output_csv)
+    store_cached_export(output_csv, result, signature)
+    return result
+
+
+def parse_csv_rows(output_csv: Path) -> ExportResult:
     with output_csv.open("r", newline="", encoding="utf-8") as csv_file:
-        reader = csv.DictReader(csv_file)
-        rows = [
-            {
-                "market": row.get("market", ""),
-                "current_oi": row.get("current_oi", ""),
-                "oiCap": row.get("oiCap", ""),
-                "fetched_at_utc": row.get("fetched_at_utc", ""),
-            }
-            for row in reader
-        ]
-    fetched_at_utc = rows[0]["fetched_at_utc"] if rows else ""
-    return ExportResult(rows=rows, fetched_at_utc=fetched_at_utc)
+        first_line = csv_file.readline()
+        if first_line.startswith(CSV_METADATA_PREFIX):
+            fetched_at_utc = first_line[len(CSV_METADATA_PREFIX) :].strip()
+        else:
+            # Older exports carry fetched_at_utc as a per-row column instead.
+            fetched_at_utc = ""
+            csv_file.seek(0)
+        records = list(csv.DictReader(csv_file))
+
+    if not fetched_at_utc and records:
+        fetched_at_utc = records[0].get("fetched_at_utc") or ""
+    return ExportResult(
+        markets=[record.get("market", "") for record in records],
+        current_oi=[record.get("current_oi", "") for record in records],
+        oi_cap=[record.get("oiCap", "") for record in records],
+        fetched_at_utc=fetched_at_utc,
+    )
 
 
 def export_to_csv() -> ExportResult:
     result = fetch_rows()
-    write_csv(result.rows, result.fetched_at_utc)
+    store_cached_export(OUTPUT_CSV, result, csv_signature(write_csv(result)))
 
-    print(f"Saved {len(result.rows)} markets to {OUTPUT_CSV}")
+    print(f"Saved {len(result)} markets to {OUTPUT_CSV}")
     print("Fetched all pairs with oiCap/current_oi.")
     return result
 
 
-def parse_decimal_arg(name: str) -> Decimal | None:
+def parse_float_arg(name: str) -> float | None:
     raw = request.args.get(name, "").strip()
     if not raw:
         return None
     try:
-        return Decimal(raw)
-    except InvalidOperation:
+        value = float(raw)
+    except ValueError:
         return None
+    return None if math.isnan(value) else value
 
 
-def apply_filters(rows: list[dict[str, str]]) -> list[dict[str, str]]:
-    market_query = request.args.get("market", "").strip().lower()
-    min_oi_cap = parse_decimal_arg("min_oi_cap")
-    max_oi_cap = parse_decimal_arg("max_oi_cap")
-    min_current_oi = parse_decimal_arg("min_current_oi")
-    max_current_oi = parse_decimal_arg("max_current_oi")
+@functools.lru_cache(maxsize=128)
+def market_pattern(query: str, regex: bool) -> re.Pattern[str]:
+    if regex:
+        try:
+            return re.compile(query, re.IGNORECASE)
+        except (re.error, OverflowError, RecursionError):
+            pass  # invalid expression: fall back to a literal match
+    return re.compile(re.escape(query), re.IGNORECASE)
 
-    filtered: list[dict[str, str]] = []
-    for row in rows:
-        if market_query and market_query not in row["market"].lower():
-            continue
 
-        oi_cap_value = as_decimal(row["oiCap"])
-        current_oi_value = as_decimal(row["current_oi"])
+def regex_requested() -> bool:
+    # Regex matching holds the GIL with no timeout, so a hostile pattern can stall the
+    # whole worker; it is only honoured when the server was started with --allow-regex.
+    return current_app.config["ALLOW_REGEX"] and request.args.get("regex") == "1"
 
-        if min_oi_cap is not None and (oi_cap_value is None or oi_cap_value < min_oi_cap):
-            continue
-        if max_oi_cap is not None and (oi_cap_value is None or oi_cap_value > max_oi_cap):
-            continue
-        if min_current_oi is not None and (current_oi_value is None or current_oi_value < min_current_oi):
-            continue
-        if max_current_oi is not None and (current_oi_value is None or current_oi_value > max_current_oi):
-            continue
 
-        filtered.append(row)
+def apply_filters(result: ExportResult) -> list[int]:
+    checks: list[Callable[[int], bool]] = []
 
-    return filtered
+    market_query = request.args.get("market", "").strip()
+    if market_query:
+        search = market_pattern(market_query, regex_requested()).search
+        markets = result.markets
+        checks.append(lambda i: search(markets[i]) is not None)
+
+    bounds = (
+        ("min_oi_cap", result.oi_cap_values, operator.ge),
+        ("max_oi_cap", result.oi_cap_values, operator.le),
+        ("min_current_oi", result.current_oi_values, operator.ge),
+        ("max_current_oi", result.current_oi_values, operator.le),
+    )
+    for arg_name, values, within in bounds:
+        bound = parse_float_arg(arg_name)
+        if bound is not None:
+            checks.append(lambda i, values=values, within=within, bound=bound: within(values[i], bound))
+
+    # Narrow the candidate indices one active check at a time.
+    indices: list[int] = list(range(len(result)))
+    for check in checks:
+        indices = [i for i in indices if check(i)]
+    return indices
 
 
 def load_for_view(refresh: bool) -> tuple[ExportResult, str, str]:
@@ -211,7 +438,7 @@ def load_for_view(refresh: bool) -> tuple[ExportResult, str, str]:
                 source = "cached CSV"
                 error = f"Live refresh failed, showing cached CSV: {exc}"
             else:
-                result = ExportResult(rows=[], fetched_at_utc="")
+                result = ExportResult.from_rows([], "")
                 source = "none"
                 error = f"Live refresh failed and no cached CSV exists: {exc}"
     else:
@@ -221,24 +448,61 @@ def load_for_view(refresh: bool) -> tuple[ExportResult, str, str]:
     return result, source, error
 
 
-def build_app() -> Flask:
+def export_validators(output_csv: Path = OUTPUT_CSV) -> tuple[str, datetime] | None:
+    try:
+        stat = output_csv.stat()
+    except FileNotFoundError:
+        return None
+    # The query string is part of the tag because filtered responses differ.
+    digest = hashlib.blake2b(
+        stat.st_mtime_ns.to_bytes(8, "little") + stat.st_size.to_bytes(8, "little"),
+        digest_size=8,
+    )
+    digest.update(request.query_string)
+    return digest.hexdigest(), datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+
+
+def is_not_modified(etag: str, last_modified: datetime) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return request.if_modified_since is not None and request.if_modified_since >= last_modified
+
+
+def compress_response(response: Response) -> Response:
+    response.vary.add("Accept-Encoding")
+    if not request.accept_encodings["gzip"]:
+        return response
+    body = response.get_data()
+    if len(body) < API_COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=API_COMPRESS_LEVEL))
+    response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def build_app(allow_regex: bool = False) -> Flask:
     app = Flask(__name__)
+    app.config["ALLOW_REGEX"] = allow_regex
+    # Compile index.html at startup; outside debug mode Jinja then serves it from cache.
+    app.jinja_env.get_template("index.html")
 
     @app.get("/")
     def index() -> str:
         refresh = request.args.get("refresh") == "1"
         result, source, error = load_for_view(refresh)
-        filtered_rows = apply_filters(result.rows)
+        indices = apply_filters(result)
         return render_template(
             "index.html",
-            rows=filtered_rows,
-            total_rows=len(result.rows),
-            filtered_rows=len(filtered_rows),
+            rows=result.row_tuples(indices),
+            total_rows=len(result),
+            filtered_rows=len(indices),
             fetched_at_utc=result.fetched_at_utc,
             source=source,
             error=error,
+            allow_regex=allow_regex,
             filters={
                 "market": request.args.get("market", ""),
+                "regex": regex_requested(),
                 "min_oi_cap": request.args.get("min_oi_cap", ""),
                 "max_oi_cap": request.args.get("max_oi_cap", ""),
                 "min_current_oi": request.args.get("min_current_oi", ""),
@@ -249,17 +513,56 @@ def build_app() -> Flask:
     @app.get("/api/markets")
     def api_markets() -> Response:
         refresh = request.args.get("refresh") == "1"
+        # Validators come from the file as it was before loading, so a concurrent
+        # rewrite can only make the tag stale (forcing a 200), never reuse it.
+        validators = None if refresh else export_validators()
+        if validators is not None and is_not_modified(*validators):
+            response = Response(status=304)
+            # Weak tags: gzip and identity bodies are the same representation.
+            response.set_etag(validators[0], weak=True)
+            response.last_modified = validators[1]
+            response.headers["Cache-Control"] = API_CACHE_CONTROL
+            response.vary.add("Accept-Encoding")
+            return response
+
         result, source, error = load_for_view(refresh)
-        filtered_rows = apply_filters(result.rows)
+        indices = apply_filters(result)
         payload = {
             "source": source,
             "error": error,
             "fetched_at_utc": result.fetched_at_utc,
-            "total_rows": len(result.rows),
-            "filtered_rows": len(filtered_rows),
-            "rows": filtered_rows,
+            "total_rows": len(result),
+            "filtered_rows": len(indices),
+            "rows": [
+                {"market": market, "current_oi": current_oi, "oiCap": oi_cap}
+                for market, current_oi, oi_cap in result.row_tuples(indices)
+            ],
         }
-        return jsonify(payload)
+        if orjson is not None:
+            response = Response(orjson.dumps(payload), mimetype="application/json")
+        else:
+            response = jsonify(payload)
+        if validators is not None:
+            response.set_etag(validators[0], weak=True)
+            response.last_modified = validators[1]
+        response.headers["Cache-Control"] = API_CACHE_CONTROL
+        return compress_response(response)
+
+    @app.get("/api/markets.csv")
+    def api_markets_csv() -> Response:
+        refresh = request.args.get("refresh") == "1"
+        error = ""
+        if refresh or not OUTPUT_CSV.exists():
+            _, _, error = load_for_view(refresh)
+            if not OUTPUT_CSV.exists():
+                return Response(f"{error}\n", status=503, mimetype="text/plain")
+        # Serve the export as-is; Werkzeug handles ETag, If-Modified-Since and Range.
+        response = send_file(OUTPUT_CSV.absolute(), mimetype="text/csv", conditional=True, max_age=15)
+        if error:
+            # Stale CSV after a failed refresh: keep serving it, but say so and keep it out of caches.
+            response.headers["X-Refresh-Error"] = " ".join(error.split()).encode("ascii", "replace").decode()
+            response.headers["Cache-Control"] = "no-store"
+        return response
 
     @app.get("/healthz")
     def healthz() -> Response:
@@ -268,19 +571,54 @@ def build_app() -> Flask:
     return app
 
 
+if BaseApplication is not None:
+
+    class GunicornApplication(BaseApplication):
+        def __init__(self, app: Flask, options: dict[str, Any]) -> None:
+            self.application = app
+            self.options = options
+            super().__init__()
+
+        def load_config(self) -> None:
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self) -> Flask:
+            return self.application
+
+
+def serve(app: Flask, host: str, port: int, dev: bool) -> None:
+    if dev or BaseApplication is None:
+        app.run(host=host, port=port)
+        return
+
+    options = {
+        "bind": f"{host}:{port}",
+        "workers": SERVE_WORKERS,
+        "threads": SERVE_THREADS,
+        "worker_class": "gthread",
+    }
+    GunicornApplication(app, options).run()
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Export Reya OI data and optionally serve a website")
     parser.add_argument("--serve", action="store_true", help="Run a local website with OI table + filters")
     parser.add_argument("--host", default="127.0.0.1", help="Host for --serve mode")
     parser.add_argument("--port", type=int, default=8000, help="Port for --serve mode")
+    parser.add_argument("--dev", action="store_true", help="Use Flask's development server instead of gunicorn")
+    parser.add_argument(
+        "--allow-regex",
+        action="store_true",
+        help="Honour regex=1 market filters (untrusted patterns can stall a worker)",
+    )
     return parser.parse_args()
 
 
 def main() -> int:
     args = parse_args()
     if args.serve:
-        app = build_app()
-        app.run(host=args.host, port=args.port)
+        serve(build_app(args.allow_regex), args.host, args.port, args.dev)
         return 0
 
     export_to_csv()